@@ -1,8 +1,18 @@
+import threading
 from datetime import datetime
 from bson import ObjectId
 
 class Video:
+    # Fields stored in the video document
+    FIELDS = (
+        "user_id", "filename", "filepath", "size", "status", "processing_options",
+        "upload_date", "process_start_time", "process_end_time", "error", "metadata", "outputs"
+    )
+
     def __init__(self, user_id, filename, filepath, size):
+        # Processing stages may run on worker threads
+        self._dirty_lock = threading.Lock()
+        self._dirty = set()
         self.user_id = user_id
         self.filename = filename
         self.filepath = filepath
@@ -25,6 +35,42 @@ class Video:
             "subtitles": None,
             "summary": None
         }
+        # Transcript shared between processing stages; not persisted
+        self.transcript = None
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in Video.FIELDS:
+            self.mark_dirty(name)
+
+    def mark_dirty(self, path):
+        """Flag a field, or a dotted path into one (e.g. "outputs.thumbnail"), for the next update"""
+        with self._dirty_lock:
+            self._dirty.add(path)
+
+    def clear_dirty(self):
+        with self._dirty_lock:
+            self._dirty.clear()
+
+    def set_output(self, name, path):
+        self.outputs[name] = path
+        self.mark_dirty(f"outputs.{name}")
+
+    def pop_dirty_fields(self):
+        """Fields and paths changed since the last call, ready for $set; resets tracking"""
+        with self._dirty_lock:
+            dirty = set(self._dirty)
+            self._dirty.clear()
+        
+        data = self.to_dict()
+        updates = {}
+        for path in dirty:
+            field, _, key = path.partition(".")
+            if key and field in dirty:
+                # The whole field is being written anyway
+                continue
+            updates[path] = data[field][key] if key else data[field]
+        return updates
 
     def to_dict(self):
         return {
@@ -58,4 +104,5 @@ class Video:
         video.error = data.get("error")
         video.metadata = data.get("metadata", {})
         video.outputs = data.get("outputs", {})
+        video.clear_dirty()
         return video
\ No newline at end of file
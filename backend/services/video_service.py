@@ -1,34 +1,235 @@
 import os
+import hashlib
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from fractions import Fraction
 from models.video import Video
 from bson.objectid import ObjectId
 from werkzeug.utils import secure_filename
 import magic
-import cv2
 import numpy as np
-from moviepy.editor import VideoFileClip
 from pydub import AudioSegment
-import tensorflow as tf
-from transformers import pipeline
 import json
 
+# cv2, moviepy, torch and transformers are imported where they are used so
+# that request handlers which never touch them don't pay their import cost
+
+# Language-specific sample texts with realistic timing, used to simulate Whisper
+_SAMPLE_TEXTS = {
+    'en': [
+        {"text": "Welcome to this video demonstration.", "start": 0.0, "end": 3.5},
+        {"text": "This showcases our advanced subtitle system.", "start": 4.0, "end": 7.5},
+        {"text": "Powered by OpenAI Whisper technology.", "start": 8.0, "end": 11.5},
+        {"text": "With precise word-level timing synchronization.", "start": 12.0, "end": 15.5},
+        {"text": "Supporting multiple languages and styles.", "start": 16.0, "end": 19.5}
+    ],
+    'ur': [
+        {"text": "اس ویڈیو ڈیمونسٹریشن میں خوش آمدید۔", "start": 0.0, "end": 3.5},
+        {"text": "یہ ہمارے جدید سب ٹائٹل سسٹم کو ظاہر کرتا ہے۔", "start": 4.0, "end": 7.5},
+        {"text": "OpenAI Whisper ٹیکنالوجی سے طاقت یافتہ۔", "start": 8.0, "end": 11.5},
+        {"text": "درست لفظ کی سطح کے وقت کی ہم آہنگی کے ساتھ۔", "start": 12.0, "end": 15.5},
+        {"text": "متعدد زبانوں اور انداز کی حمایت کرتا ہے۔", "start": 16.0, "end": 19.5}
+    ],
+    'ru-ur': [
+        {"text": "Is video demonstration mein khush aamdeed.", "start": 0.0, "end": 3.5},
+        {"text": "Yeh hamara advanced subtitle system dikhata hai.", "start": 4.0, "end": 7.5},
+        {"text": "OpenAI Whisper technology se powered.", "start": 8.0, "end": 11.5},
+        {"text": "Precise word-level timing sync ke saath.", "start": 12.0, "end": 15.5},
+        {"text": "Multiple languages aur styles support karta hai.", "start": 16.0, "end": 19.5}
+    ],
+    'es': [
+        {"text": "Bienvenido a esta demostración de video.", "start": 0.0, "end": 3.5},
+        {"text": "Esto muestra nuestro sistema avanzado de subtítulos.", "start": 4.0, "end": 7.5},
+        {"text": "Impulsado por la tecnología OpenAI Whisper.", "start": 8.0, "end": 11.5},
+        {"text": "Con sincronización precisa a nivel de palabra.", "start": 12.0, "end": 15.5},
+        {"text": "Compatible con múltiples idiomas y estilos.", "start": 16.0, "end": 19.5}
+    ],
+    'fr': [
+        {"text": "Bienvenue dans cette démonstration vidéo.", "start": 0.0, "end": 3.5},
+        {"text": "Ceci présente notre système de sous-titres avancé.", "start": 4.0, "end": 7.5},
+        {"text": "Alimenté par la technologie OpenAI Whisper.", "start": 8.0, "end": 11.5},
+        {"text": "Avec synchronisation précise au niveau des mots.", "start": 12.0, "end": 15.5},
+        {"text": "Prenant en charge plusieurs langues et styles.", "start": 16.0, "end": 19.5}
+    ],
+    'de': [
+        {"text": "Willkommen zu dieser Video-Demonstration.", "start": 0.0, "end": 3.5},
+        {"text": "Dies zeigt unser fortschrittliches Untertitelsystem.", "start": 4.0, "end": 7.5},
+        {"text": "Angetrieben von OpenAI Whisper-Technologie.", "start": 8.0, "end": 11.5},
+        {"text": "Mit präziser Synchronisation auf Wortebene.", "start": 12.0, "end": 15.5},
+        {"text": "Unterstützt mehrere Sprachen und Stile.", "start": 16.0, "end": 19.5}
+    ]
+}
+
+# Summarization pipeline shared by the whole process, loaded on first use
+_summarizer = None
+_summarizer_loaded = False
+_summarizer_lock = threading.Lock()
+
+
+def _load_summarizer():
+    import torch
+    from transformers import pipeline
+    
+    # On CPU, prefer an INT8-quantized ONNX export of the model when one is configured:
+    #   optimum-cli export onnx --model facebook/bart-large-cnn --task text2text-generation <dir>
+    #   then onnxruntime.quantization.quantize_dynamic on the exported graphs
+    onnx_path = os.getenv('SUMMARIZER_ONNX_PATH')
+    if onnx_path and not torch.cuda.is_available():
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+            from transformers import AutoTokenizer
+            
+            model = ORTModelForSeq2SeqLM.from_pretrained(onnx_path, provider="CPUExecutionProvider")
+            return pipeline("summarization", model=model, tokenizer=AutoTokenizer.from_pretrained(onnx_path))
+        except Exception as e:
+            print(f"⚠️  Warning: Could not load ONNX summarizer from {onnx_path}: {e}")
+    
+    # Run on the GPU in FP16 when available (half the weight bytes, Tensor Core matmuls)
+    device_kwargs = {"device": 0, "torch_dtype": torch.float16} if torch.cuda.is_available() else {}
+    return pipeline("summarization", model="facebook/bart-large-cnn", **device_kwargs)
+
+
+def _get_summarizer():
+    """Return the process-wide summarization pipeline, or None if it can't be loaded"""
+    global _summarizer, _summarizer_loaded
+    with _summarizer_lock:
+        if not _summarizer_loaded:
+            try:
+                _summarizer = _load_summarizer()
+                print("✅ Summarization model initialized successfully")
+            except Exception as e:
+                print(f"⚠️  Warning: Could not initialize summarization model: {e}")
+            _summarizer_loaded = True
+    return _summarizer
+
+
+# faster-whisper model (and its batched pipeline) shared by the whole process, loaded on first use
+_whisper = (None, None)
+_whisper_loaded = False
+_whisper_lock = threading.Lock()
+
+
+def _load_whisper():
+    # Real transcription uses faster-whisper (CTranslate2 INT8 weights) when it
+    # is installed; without it transcripts are simulated
+    from faster_whisper import WhisperModel
+    
+    model = WhisperModel(os.getenv('WHISPER_MODEL', 'base'), device="auto", compute_type="int8_float16")
+    try:
+        from faster_whisper import BatchedInferencePipeline
+    except ImportError:
+        # faster-whisper < 1.1
+        return model, None
+    # Splits long audio on VAD speech boundaries and decodes the chunks in batches
+    return model, BatchedInferencePipeline(model=model)
+
+
+def _get_whisper():
+    """Return the process-wide (model, batched pipeline) pair; (None, None) if faster-whisper can't be loaded"""
+    global _whisper, _whisper_loaded
+    with _whisper_lock:
+        if not _whisper_loaded:
+            try:
+                _whisper = _load_whisper()
+                print("✅ Whisper model initialized successfully")
+            except ImportError:
+                pass
+            except Exception as e:
+                print(f"⚠️  Warning: Could not initialize Whisper model: {e}")
+            _whisper_loaded = True
+    return _whisper
+
+
+def _brightness_contrast_lut(alpha, beta):
+    """256-entry uint8 table for the saturating map ``value * alpha + beta``"""
+    return np.clip(np.arange(256) * alpha + beta, 0, 255).astype(np.uint8)
+
+
+def _numpy_lut(image, lut, out=None):
+    """Map every uint8 sample of ``image`` through ``lut``, written into ``out`` when it fits"""
+    if out is None or out.shape != image.shape:
+        out = np.empty_like(image)
+    # uint8 indices are always < 256, so 'clip' never clips; it just lets take
+    # write into ``out`` directly instead of through a temporary ('raise' buffers)
+    return np.take(lut, image, out=out, mode='clip')
+
+
+def _lut_kernel():
+    """cv2.LUT when OpenCV is installed, otherwise the NumPy gather with the same signature"""
+    try:
+        import cv2
+    except ImportError:
+        return _numpy_lut
+    # cv2.LUT is SIMD-vectorized; a (256,) table applies to every channel
+    return cv2.LUT
+
+
 class VideoService:
+    # Fields returned when listing a user's videos
+    LIST_PROJECTION = {field: 1 for field in Video.FIELDS}
+
+    # deshake motion search range in pixels for each stabilization level
+    STABILIZATION_SEARCH_RANGE = {"low": 16, "medium": 32, "high": 64}
+
+    # Sample rate of the audio fed to speech recognition
+    ASR_SAMPLE_RATE = 16000
+    # Audio longer than this is transcribed as VAD-split chunks in batches
+    BATCHED_TRANSCRIPTION_SECONDS = 120
+
+    # The magic database is loaded once per process and shared by every
+    # VideoService instance
+    _magic = None
+    _shared_loaded = False
+    _shared_lock = threading.Lock()
+
     def __init__(self, db):
         self.db = db
         self.videos = db.videos
+        # Listing a user's videos filters on user_id; avoid a collection scan
+        self.videos.create_index("user_id")
+        # Probed metadata keyed by file fingerprint, reused for re-uploads
+        self.file_meta = db.file_meta
+        self.file_meta.create_index("fingerprint", unique=True)
         self.upload_folder = os.getenv('UPLOAD_FOLDER', 'uploads')
         self.max_content_length = int(os.getenv('MAX_CONTENT_LENGTH', 500 * 1024 * 1024))
+        self.upload_buffer_size = int(os.getenv('UPLOAD_BUFFER_SIZE', 1024 * 1024))
+        self.whisper_batch_size = int(os.getenv('WHISPER_BATCH_SIZE', 8))
         
-        # Initialize AI models
-        try:
-            self.summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-            # Simulate Whisper - in production, use: import whisper; self.whisper_model = whisper.load_model("base")
-            self.whisper_model = None
-            print("✅ AI models initialized successfully")
-        except Exception as e:
-            print(f"⚠️  Warning: Could not initialize AI models: {e}")
-            self.summarizer = None
-            self.whisper_model = None
+        # Summaries keyed by transcript fingerprint, evicted LRU or after the TTL
+        self.summary_cache_size = int(os.getenv('SUMMARY_CACHE_SIZE', 128))
+        self.summary_cache_ttl = int(os.getenv('SUMMARY_CACHE_TTL', 3600))
+        self._summary_cache = OrderedDict()
+        self._summary_cache_lock = threading.Lock()
+        
+        self._load_shared_resources()
+
+    @classmethod
+    def _load_shared_resources(cls):
+        with cls._shared_lock:
+            if cls._shared_loaded:
+                return
+            
+            cls._magic = magic.Magic(mime=True)
+            cls._shared_loaded = True
+
+    @property
+    def summarizer(self):
+        # Loaded lazily so starting a worker doesn't load BART; run
+        # _get_summarizer() before forking (e.g. gunicorn --preload) to share it
+        return _get_summarizer()
+
+    @property
+    def whisper_model(self):
+        # Loaded (and possibly downloaded) on the first transcription, not at import
+        return _get_whisper()[0]
+
+    @property
+    def whisper_batched(self):
+        return _get_whisper()[1]
 
     def save_video(self, file, user_id):
         if not file:
@@ -40,11 +241,16 @@ class VideoService:
         # Create upload directory if it doesn't exist
         os.makedirs(self.upload_folder, exist_ok=True)
         
-        # Save file
-        file.save(filepath)
+        # Save file in large blocks (werkzeug defaults to 16 KB, i.e. many more write calls)
+        file.save(filepath, buffer_size=self.upload_buffer_size)
+        
+        # Read the header and size through a single open
+        with open(filepath, 'rb') as f:
+            head = f.read(8192)
+            size = os.fstat(f.fileno()).st_size
         
         # Validate file
-        if not self._is_valid_video(filepath):
+        if not self._is_valid_video(filepath, head):
             os.remove(filepath)
             raise ValueError("Invalid video file")
 
@@ -53,7 +259,7 @@ class VideoService:
             user_id=ObjectId(user_id),
             filename=filename,
             filepath=filepath,
-            size=os.path.getsize(filepath)
+            size=size
         )
         
         # Extract metadata
@@ -71,27 +277,24 @@ class VideoService:
         video.status = "processing"
         video.process_start_time = datetime.utcnow()
         video.processing_options = options
+        self._checkpoint(video_id, video)
         
         try:
-            # Enhanced processing with actual options
-            if options.get('cut_silence'):
-                self._cut_silence(video)
-            
-            if options.get('enhance_audio'):
-                self._enhance_audio(video, options)
-            
+            # Enhanced processing with actual options. The branches share no
+            # inputs or outputs and spend their time in ffmpeg/OpenCV/model code,
+            # so they run concurrently.
+            branches = [self._process_media, self._process_transcript]
             if options.get('generate_thumbnail'):
-                self._generate_thumbnail(video)
-            
-            if options.get('generate_subtitles'):
-                self._generate_advanced_subtitles(video, options)
-            
-            if options.get('summarize'):
-                self._summarize_video(video)
-
-            # Apply video enhancements
-            if any([options.get('stabilization'), options.get('brightness'), options.get('contrast')]):
-                self._apply_video_enhancements(video, options)
+                branches.append(lambda video, options: self._generate_thumbnail(video))
+            
+            # Each branch can drive a multi-threaded ffmpeg encode, so don't run more than there are cores
+            with ThreadPoolExecutor(max_workers=min(len(branches), os.cpu_count() or 1)) as executor:
+                futures = [executor.submit(branch, video, options) for branch in branches]
+                # Surface the first branch that actually failed rather than the first submitted
+                for future in as_completed(futures):
+                    future.result()
+                    # Save each branch's outputs as soon as it finishes
+                    self._checkpoint(video_id, video)
 
             video.status = "completed"
             video.process_end_time = datetime.utcnow()
@@ -103,11 +306,45 @@ class VideoService:
             raise
         
         finally:
+            self._checkpoint(video_id, video)
+
+    def _checkpoint(self, video_id, video):
+        """Write only the fields and output paths that changed since the last checkpoint"""
+        updates = video.pop_dirty_fields()
+        if updates:
             self.videos.update_one(
                 {"_id": ObjectId(video_id)},
-                {"$set": video.to_dict()}
+                {"$set": updates}
             )
 
+    def _process_media(self, video, options):
+        """Stages that write processed_video, kept in order so the last one wins"""
+        if options.get('cut_silence'):
+            self._cut_silence(video)
+        
+        if options.get('enhance_audio'):
+            self._enhance_audio(video, options)
+
+        # Apply video enhancements
+        if self._needs_video_enhancement(options):
+            self._apply_video_enhancements(video, options)
+
+    def _needs_video_enhancement(self, options):
+        """False when every enhancement is at its identity setting, so the re-encode can be skipped"""
+        return (
+            options.get('brightness') not in (None, 100)
+            or options.get('contrast') not in (None, 100)
+            or options.get('stabilization') not in (None, '', 'none')
+        )
+
+    def _process_transcript(self, video, options):
+        """Stages that share the video transcript"""
+        if options.get('generate_subtitles'):
+            self._generate_advanced_subtitles(video, options)
+        
+        if options.get('summarize'):
+            self._summarize_video(video)
+
     def get_video(self, video_id):
         video_data = self.videos.find_one({"_id": ObjectId(video_id)})
         if not video_data:
@@ -115,8 +352,12 @@ class VideoService:
         return Video.from_dict(video_data)
 
     def get_user_videos(self, user_id):
-        videos = self.videos.find({"user_id": ObjectId(user_id)})
-        return [Video.from_dict(video).to_dict() for video in videos]
+        # Serialize the projected documents directly instead of round-tripping through Video
+        videos = self.videos.find({"user_id": ObjectId(user_id)}, projection=self.LIST_PROJECTION).batch_size(200)
+        return [
+            {**video, "_id": str(video["_id"]), "user_id": str(video["user_id"])}
+            for video in videos
+        ]
 
     def delete_video(self, video_id, user_id):
         video = self.get_video(video_id)
@@ -137,10 +378,9 @@ class VideoService:
         # Delete from database
         self.videos.delete_one({"_id": ObjectId(video_id)})
 
-    def _is_valid_video(self, filepath):
+    def _is_valid_video(self, filepath, head):
         try:
-            mime = magic.Magic(mime=True)
-            file_type = mime.from_file(filepath)
+            file_type = self._magic.from_buffer(head)
             return file_type.startswith('video/')
         except:
             # Fallback: check file extension
@@ -148,20 +388,49 @@ class VideoService:
             return any(filepath.lower().endswith(ext) for ext in valid_extensions)
 
     def _extract_metadata(self, video):
+        video.metadata["format"] = os.path.splitext(video.filename)[1][1:]
         try:
-            clip = VideoFileClip(video.filepath)
-            video.metadata.update({
-                "duration": clip.duration,
-                "fps": clip.fps,
-                "resolution": f"{clip.size[0]}x{clip.size[1]}",
-                "format": os.path.splitext(video.filename)[1][1:]
-            })
-            clip.close()
+            fingerprint = self._file_fingerprint(video.filepath, video.size)
+            cached = self.file_meta.find_one({"fingerprint": fingerprint})
+            if cached:
+                video.metadata.update(cached["metadata"])
+                return
+            
+            probed = self._probe_video(video.filepath)
+            video.metadata.update(probed)
+            
+            self.file_meta.update_one(
+                {"fingerprint": fingerprint},
+                {"$setOnInsert": {"metadata": probed}},
+                upsert=True
+            )
         except Exception as e:
             print(f"Error extracting metadata: {e}")
-            video.metadata.update({
-                "format": os.path.splitext(video.filename)[1][1:]
-            })
+
+    def _probe_video(self, filepath):
+        """Read duration, fps and resolution from the container headers via ffprobe"""
+        # Ask only for the first video stream and the four values used
+        proc = subprocess.run(
+            ["ffprobe", "-v", "quiet", "-print_format", "json", "-select_streams", "v:0",
+             "-show_entries", "format=duration:stream=width,height,r_frame_rate", filepath],
+            check=True, capture_output=True
+        )
+        data = json.loads(proc.stdout)
+        stream = data["streams"][0]
+        frame_rate = Fraction(stream["r_frame_rate"]) if stream.get("r_frame_rate", "0/0") != "0/0" else None
+        return {
+            "duration": float(data["format"]["duration"]),
+            "fps": float(frame_rate) if frame_rate else None,
+            "resolution": f"{stream['width']}x{stream['height']}"
+        }
+
+    def _file_fingerprint(self, filepath, size):
+        """Cheap content key: SHA-1 of the first and last 4 KB plus the file size"""
+        with open(filepath, 'rb') as f:
+            head = f.read(4096)
+            f.seek(max(size - 4096, 0))
+            tail = f.read(4096)
+        return hashlib.sha1(head + tail + str(size).encode()).hexdigest()
 
     def _generate_advanced_subtitles(self, video, options):
         """Advanced subtitle generation with Whisper integration"""
@@ -171,13 +440,7 @@ class VideoService:
             
             print(f"🎤 Generating advanced subtitles: Language={language}, Style={style}")
             
-            # Extract audio for transcription
-            clip = VideoFileClip(video.filepath)
-            audio_path = f"{os.path.splitext(video.filepath)[0]}_audio.wav"
-            clip.audio.write_audiofile(audio_path, verbose=False, logger=None)
-            
-            # Simulate Whisper transcription with realistic data
-            subtitle_data = self._simulate_whisper_transcription(language, clip.duration)
+            subtitle_data = self._ensure_transcript(video, language)
             
             # Generate both SRT and JSON formats
             srt_content = self._create_srt_from_data(subtitle_data)
@@ -193,12 +456,8 @@ class VideoService:
             with open(json_path, 'w', encoding='utf-8') as f:
                 f.write(json_content)
             
-            video.outputs["subtitles"] = srt_path
-            video.outputs["subtitles_json"] = json_path
-            
-            clip.close()
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
+            video.set_output("subtitles", srt_path)
+            video.set_output("subtitles_json", json_path)
                 
             print(f"✅ Advanced subtitles generated successfully")
                 
@@ -207,56 +466,60 @@ class VideoService:
             # Create fallback subtitles
             self._create_fallback_subtitles(video, options)
 
-    def _simulate_whisper_transcription(self, language, duration):
-        """Simulate Whisper transcription with word-level timestamps"""
+    def _ensure_transcript(self, video, language):
+        """Transcribe the video once and share the result between subtitles and summary"""
+        if video.transcript and video.transcript['language'] == language:
+            return video.transcript
         
-        # Language-specific sample texts with realistic timing
-        sample_texts = {
-            'en': [
-                {"text": "Welcome to this video demonstration.", "start": 0.0, "end": 3.5},
-                {"text": "This showcases our advanced subtitle system.", "start": 4.0, "end": 7.5},
-                {"text": "Powered by OpenAI Whisper technology.", "start": 8.0, "end": 11.5},
-                {"text": "With precise word-level timing synchronization.", "start": 12.0, "end": 15.5},
-                {"text": "Supporting multiple languages and styles.", "start": 16.0, "end": 19.5}
-            ],
-            'ur': [
-                {"text": "اس ویڈیو ڈیمونسٹریشن میں خوش آمدید۔", "start": 0.0, "end": 3.5},
-                {"text": "یہ ہمارے جدید سب ٹائٹل سسٹم کو ظاہر کرتا ہے۔", "start": 4.0, "end": 7.5},
-                {"text": "OpenAI Whisper ٹیکنالوجی سے طاقت یافتہ۔", "start": 8.0, "end": 11.5},
-                {"text": "درست لفظ کی سطح کے وقت کی ہم آہنگی کے ساتھ۔", "start": 12.0, "end": 15.5},
-                {"text": "متعدد زبانوں اور انداز کی حمایت کرتا ہے۔", "start": 16.0, "end": 19.5}
-            ],
-            'ru-ur': [
-                {"text": "Is video demonstration mein khush aamdeed.", "start": 0.0, "end": 3.5},
-                {"text": "Yeh hamara advanced subtitle system dikhata hai.", "start": 4.0, "end": 7.5},
-                {"text": "OpenAI Whisper technology se powered.", "start": 8.0, "end": 11.5},
-                {"text": "Precise word-level timing sync ke saath.", "start": 12.0, "end": 15.5},
-                {"text": "Multiple languages aur styles support karta hai.", "start": 16.0, "end": 19.5}
-            ],
-            'es': [
-                {"text": "Bienvenido a esta demostración de video.", "start": 0.0, "end": 3.5},
-                {"text": "Esto muestra nuestro sistema avanzado de subtítulos.", "start": 4.0, "end": 7.5},
-                {"text": "Impulsado por la tecnología OpenAI Whisper.", "start": 8.0, "end": 11.5},
-                {"text": "Con sincronización precisa a nivel de palabra.", "start": 12.0, "end": 15.5},
-                {"text": "Compatible con múltiples idiomas y estilos.", "start": 16.0, "end": 19.5}
-            ],
-            'fr': [
-                {"text": "Bienvenue dans cette démonstration vidéo.", "start": 0.0, "end": 3.5},
-                {"text": "Ceci présente notre système de sous-titres avancé.", "start": 4.0, "end": 7.5},
-                {"text": "Alimenté par la technologie OpenAI Whisper.", "start": 8.0, "end": 11.5},
-                {"text": "Avec synchronisation précise au niveau des mots.", "start": 12.0, "end": 15.5},
-                {"text": "Prenant en charge plusieurs langues et styles.", "start": 16.0, "end": 19.5}
+        # Roman Urdu has no Whisper language code; auto-detection would return Urdu
+        # or Hindi script, so it keeps the simulated Roman Urdu transcript
+        if language != 'ru-ur' and self.whisper_model:
+            # Decode audio for transcription straight into memory as 16 kHz mono,
+            # the rate the ASR model expects
+            audio = self._load_audio(video.filepath)
+            video.transcript = self._whisper_transcription(audio, language)
+        else:
+            # Simulate Whisper transcription with realistic data; the duration
+            # probed at upload is enough, so the audio is never decoded
+            duration = video.metadata.get('duration') or 0
+            video.transcript = self._simulate_whisper_transcription(language, duration)
+        
+        return video.transcript
+
+    def _whisper_transcription(self, audio, language):
+        """Transcribe 16 kHz mono float32 samples with faster-whisper"""
+        if self.whisper_batched and len(audio) > self.BATCHED_TRANSCRIPTION_SECONDS * self.ASR_SAMPLE_RATE:
+            # Independent ~30 s speech chunks decoded in parallel instead of one sequential pass
+            segments, info = self.whisper_batched.transcribe(
+                audio, language=language, batch_size=self.whisper_batch_size
+            )
+        else:
+            # The VAD filter skips silence instead of decoding it
+            segments, info = self.whisper_model.transcribe(audio, language=language, vad_filter=True)
+        return {
+            "language": language,
+            "segments": [
+                {"text": segment.text.strip(), "start": segment.start, "end": segment.end}
+                for segment in segments
             ],
-            'de': [
-                {"text": "Willkommen zu dieser Video-Demonstration.", "start": 0.0, "end": 3.5},
-                {"text": "Dies zeigt unser fortschrittliches Untertitelsystem.", "start": 4.0, "end": 7.5},
-                {"text": "Angetrieben von OpenAI Whisper-Technologie.", "start": 8.0, "end": 11.5},
-                {"text": "Mit präziser Synchronisation auf Wortebene.", "start": 12.0, "end": 15.5},
-                {"text": "Unterstützt mehrere Sprachen und Stile.", "start": 16.0, "end": 19.5}
-            ]
+            "word_timestamps": False,
+            "confidence": info.language_probability
         }
+
+    def _load_audio(self, filepath):
+        """Decode the audio track to mono float32 samples in [-1, 1] through an ffmpeg pipe"""
+        proc = subprocess.run(
+            ["ffmpeg", "-i", filepath, "-vn", "-f", "s16le", "-acodec", "pcm_s16le",
+             "-ac", "1", "-ar", str(self.ASR_SAMPLE_RATE), "-"],
+            check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        return np.frombuffer(proc.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+    def _simulate_whisper_transcription(self, language, duration):
+        """Simulate Whisper transcription with word-level timestamps"""
         
-        segments = sample_texts.get(language, sample_texts['en'])
+        # Copy the template segments; their timings are scaled below
+        segments = [dict(segment) for segment in _SAMPLE_TEXTS.get(language, _SAMPLE_TEXTS['en'])]
         
         # Adjust timing based on actual video duration
         if duration > 20:
@@ -275,136 +538,224 @@ class VideoService:
 
     def _create_srt_from_data(self, subtitle_data):
         """Create SRT format from subtitle data"""
-        srt_content = ""
+        # Collect the cues and join once; += re-copies the whole string for every cue
+        cues = []
         
         for i, segment in enumerate(subtitle_data['segments'], 1):
             start_time = self._format_srt_timestamp(segment['start'])
             end_time = self._format_srt_timestamp(segment['end'])
-            
-            srt_content += f"{i}\n"
-            srt_content += f"{start_time} --> {end_time}\n"
-            srt_content += f"{segment['text']}\n\n"
+            cues.append(f"{i}\n{start_time} --> {end_time}\n{segment['text']}\n\n")
         
-        return srt_content
+        return "".join(cues)
 
     def _format_srt_timestamp(self, seconds):
         """Format timestamp for SRT format (HH:MM:SS,mmm)"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        milliseconds = int((seconds % 1) * 1000)
+        # Integer arithmetic on whole milliseconds; seconds % 1 loses them to float error (4.6 -> ,599)
+        milliseconds = round(seconds * 1000)
+        hours, milliseconds = divmod(milliseconds, 3600000)
+        minutes, milliseconds = divmod(milliseconds, 60000)
+        secs, milliseconds = divmod(milliseconds, 1000)
         return f"{hours:02d}:{minutes:02d}:{secs:02d},{milliseconds:03d}"
 
     def _apply_video_enhancements(self, video, options):
         """Apply video enhancements like brightness, contrast, stabilization"""
         try:
-            clip = VideoFileClip(video.filepath)
-            
-            # Apply brightness and contrast adjustments
+            # Apply brightness and contrast adjustments:
+            # (img * brightness - 128) * contrast + 128 folded into one affine op
             brightness = options.get('brightness', 100) / 100.0
             contrast = options.get('contrast', 100) / 100.0
-            
-            if brightness != 1.0 or contrast != 1.0:
-                def adjust_brightness_contrast(image):
-                    img = image.astype(np.float32)
-                    
-                    if brightness != 1.0:
-                        img = img * brightness
-                    
-                    if contrast != 1.0:
-                        img = (img - 128) * contrast + 128
-                    
-                    img = np.clip(img, 0, 255)
-                    return img.astype(np.uint8)
-                
-                clip = clip.fl_image(adjust_brightness_contrast)
+            alpha = brightness * contrast
+            beta = 128.0 * (1.0 - contrast)
             
             # Apply stabilization
             stabilization = options.get('stabilization', 'none')
             if stabilization != 'none':
                 print(f"🎬 Applying {stabilization} stabilization")
-                # In production, implement actual stabilization algorithms
             
             # Save enhanced video
             output_path = f"{os.path.splitext(video.filepath)[0]}_enhanced.mp4"
-            clip.write_videofile(output_path, codec='libx264', audio_codec='aac', verbose=False, logger=None)
-            video.outputs["processed_video"] = output_path
+            try:
+                self._enhance_with_ffmpeg(video.filepath, output_path, alpha, beta, stabilization)
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"⚠️  ffmpeg enhancement failed ({e}), falling back to moviepy")
+                self._enhance_with_moviepy(video.filepath, output_path, alpha, beta)
+            video.set_output("processed_video", output_path)
             
-            clip.close()
             print("✅ Video enhancement completed")
             
         except Exception as e:
             print(f"❌ Error applying video enhancements: {e}")
             raise
 
+    def _enhance_with_ffmpeg(self, filepath, output_path, alpha, beta, stabilization='none'):
+        """Stabilization and brightness/contrast as one ffmpeg filtergraph; frames never reach Python"""
+        filters = []
+        if stabilization in self.STABILIZATION_SEARCH_RANGE:
+            # Single-pass motion compensation; larger search ranges correct bigger shakes
+            search = self.STABILIZATION_SEARCH_RANGE[stabilization]
+            filters.append(f"deshake=rx={search}:ry={search}")
+        
+        if alpha != 1.0 or beta != 0.0:
+            # lutrgb evaluates the expression once per value into a 256-entry table
+            expr = f"'clip(val*{alpha:.4f}{beta:+.4f},0,255)'"
+            filters.append(f"lutrgb=r={expr}:g={expr}:b={expr}")
+        
+        command = ["ffmpeg", "-y", "-i", filepath]
+        if filters:
+            command += ["-vf", ",".join(filters)]
+        command += [
+            "-c:v", "libx264", "-preset", "ultrafast", "-threads", "0", "-pix_fmt", "yuv420p",
+            "-c:a", "aac", output_path
+        ]
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def _enhance_with_moviepy(self, filepath, output_path, alpha, beta):
+        """Frame-by-frame fallback when ffmpeg cannot be run directly (no stabilization)"""
+        from moviepy.editor import VideoFileClip
+        
+        clip = VideoFileClip(filepath)
+        
+        if alpha != 1.0 or beta != 0.0:
+            # Brightness/contrast only ever maps 256 input levels, so compute them
+            # once and apply the table with a single gather per frame into a
+            # reused output buffer
+            lut = _brightness_contrast_lut(alpha, beta)
+            apply_lut = _lut_kernel()
+            frame_buffer = {"out": None}
+
+            def adjust_brightness_contrast(image):
+                frame_buffer["out"] = apply_lut(image, lut, frame_buffer["out"])
+                return frame_buffer["out"]
+
+            clip = clip.fl_image(adjust_brightness_contrast)
+        
+        clip.write_videofile(
+            output_path, codec='libx264', audio_codec='aac', preset='ultrafast',
+            threads=os.cpu_count(), verbose=False, logger=None
+        )
+        clip.close()
+
     def _cut_silence(self, video):
         try:
             audio = AudioSegment.from_file(video.filepath)
-            chunks = []
             silence_thresh = -40
             min_silence_len = 500
             
             # Process audio in chunks
             chunk_length = 10000
-            for i in range(0, len(audio), chunk_length):
-                chunk = audio[i:i + chunk_length]
-                if chunk.dBFS > silence_thresh:
-                    chunks.append(chunk)
+            chunk_dbfs = self._chunk_dbfs(audio, chunk_length)
+            chunk_bytes = int(audio.frame_rate * chunk_length / 1000) * audio.frame_width
+            raw = memoryview(audio.raw_data)
+            chunks = [raw[i * chunk_bytes:(i + 1) * chunk_bytes] for i in np.flatnonzero(chunk_dbfs > silence_thresh)]
             
-            # Combine non-silent chunks
-            processed_audio = AudioSegment.empty()
-            for chunk in chunks:
-                processed_audio += chunk
+            # Combine non-silent chunks with a single join (repeated += re-copies the whole buffer)
+            processed_audio = audio._spawn(b"".join(chunks))
             
             # Save processed audio
             output_path = f"{os.path.splitext(video.filepath)[0]}_processed.mp4"
             processed_audio.export(output_path, format="mp4")
-            video.outputs["processed_video"] = output_path
+            video.set_output("processed_video", output_path)
             print("✅ Audio silence cutting completed")
         except Exception as e:
             print(f"❌ Error cutting silence: {e}")
 
+    def _chunk_dbfs(self, audio, chunk_length):
+        """Loudness (dBFS) of each chunk_length ms window, computed in one pass over the raw samples"""
+        sample_types = {1: np.int8, 2: np.int16, 4: np.int32}
+        samples = np.frombuffer(audio.raw_data, dtype=sample_types[audio.sample_width])
+
+        chunk_samples = int(audio.frame_rate * chunk_length / 1000) * audio.channels
+        n_full = len(samples) // chunk_samples
+        full = samples[:n_full * chunk_samples].reshape(n_full, chunk_samples)
+        tail = samples[n_full * chunk_samples:]
+
+        # einsum casts to float64 in small buffers, so the whole file is never copied to float
+        sum_sq = np.einsum('ij,ij->i', full, full, dtype=np.float64)
+        counts = np.full(n_full, chunk_samples, dtype=np.float64)
+        if len(tail):
+            sum_sq = np.append(sum_sq, np.einsum('i,i->', tail, tail, dtype=np.float64))
+            counts = np.append(counts, len(tail))
+
+        rms = np.sqrt(sum_sq / counts)
+        with np.errstate(divide='ignore'):
+            # Digital silence gives -inf, matching AudioSegment.dBFS
+            return 20 * np.log10(rms / audio.max_possible_amplitude)
+
     def _enhance_audio(self, video, options):
         try:
-            audio = AudioSegment.from_file(video.filepath)
-            
             enhancement_type = options.get('audio_enhancement_type', 'full')
             
             if enhancement_type == 'clear':
-                enhanced = audio.normalize()
-                enhanced = enhanced.high_pass_filter(80)
+                filter_chain = "highpass=f=80,loudnorm"
             elif enhancement_type == 'music':
-                enhanced = audio.normalize()
-                enhanced = enhanced.compress_dynamic_range()
+                filter_chain = "acompressor,loudnorm"
             else:  # 'full' enhancement
-                enhanced = audio.normalize()
-                enhanced = enhanced.compress_dynamic_range()
-                enhanced = enhanced.high_pass_filter(80)
+                filter_chain = "highpass=f=80,acompressor,loudnorm"
             
+            # One streaming ffmpeg pass. loudnorm upsamples to 192 kHz internally, so
+            # resample to 48 kHz rather than letting AAC pick its highest rate.
             output_path = f"{os.path.splitext(video.filepath)[0]}_enhanced_audio.mp4"
-            enhanced.export(output_path, format="mp4")
-            video.outputs["processed_video"] = output_path
+            command = ["ffmpeg", "-y", "-i", video.filepath, "-af", filter_chain, "-ar", "48000", "-c:a", "aac"]
+            try:
+                # Copy the video stream when mp4 can hold its codec
+                subprocess.run(
+                    command + ["-c:v", "copy", output_path],
+                    check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+            except subprocess.CalledProcessError:
+                # e.g. wmv3/flv1 from .wmv/.flv uploads can't go into mp4 as-is
+                subprocess.run(
+                    command + ["-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", output_path],
+                    check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+            video.set_output("processed_video", output_path)
             print("✅ Audio enhancement completed")
         except Exception as e:
             print(f"❌ Error enhancing audio: {e}")
 
     def _generate_thumbnail(self, video):
         try:
-            cap = cv2.VideoCapture(video.filepath)
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            cap.set(cv2.CAP_PROP_POS_FRAMES, total_frames // 2)
-            ret, frame = cap.read()
+            thumbnail_path = f"{os.path.splitext(video.filepath)[0]}_thumb.jpg"
+            duration = video.metadata.get('duration')
             
-            if ret:
-                thumbnail_path = f"{os.path.splitext(video.filepath)[0]}_thumb.jpg"
-                cv2.imwrite(thumbnail_path, frame)
-                video.outputs["thumbnail"] = thumbnail_path
-                print("✅ Thumbnail generation completed")
+            if not duration or not self._thumbnail_with_ffmpeg(video.filepath, duration / 2, thumbnail_path):
+                self._thumbnail_with_opencv(video.filepath, duration, thumbnail_path)
             
-            cap.release()
+            video.set_output("thumbnail", thumbnail_path)
+            print("✅ Thumbnail generation completed")
         except Exception as e:
             print(f"❌ Error generating thumbnail: {e}")
 
+    def _thumbnail_with_ffmpeg(self, filepath, position, thumbnail_path):
+        """Grab one frame with input seeking (-ss before -i), independent of file size"""
+        try:
+            subprocess.run(
+                ["ffmpeg", "-y", "-ss", f"{position:.3f}", "-i", filepath,
+                 "-frames:v", "1", "-q:v", "2", thumbnail_path],
+                check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            return True
+        except (OSError, subprocess.CalledProcessError):
+            return False
+
+    def _thumbnail_with_opencv(self, filepath, duration, thumbnail_path):
+        import cv2
+        
+        cap = cv2.VideoCapture(filepath, cv2.CAP_FFMPEG)
+        if not duration:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            duration = cap.get(cv2.CAP_PROP_FRAME_COUNT) / fps if fps else 0
+        
+        # Time-based seek lets the demuxer jump to the nearest keyframe
+        # instead of decoding forward to a frame index
+        cap.set(cv2.CAP_PROP_POS_MSEC, duration * 1000 / 2)
+        ret, frame = cap.read()
+        cap.release()
+        
+        if not ret:
+            raise ValueError("Could not read a frame for the thumbnail")
+        cv2.imwrite(thumbnail_path, frame)
+
     def _create_fallback_subtitles(self, video, options):
         """Create fallback subtitles when advanced generation fails"""
         language = options.get('subtitle_language', 'en')
@@ -416,7 +767,7 @@ class VideoService:
         with open(srt_path, 'w', encoding='utf-8') as f:
             f.write(srt_content)
         
-        video.outputs["subtitles"] = srt_path
+        video.set_output("subtitles", srt_path)
         print("✅ Fallback subtitles created")
 
     def _summarize_video(self, video):
@@ -425,17 +776,13 @@ class VideoService:
             return
             
         try:
-            # Extract audio and convert to text
-            clip = VideoFileClip(video.filepath)
-            audio_path = f"{os.path.splitext(video.filepath)[0]}_audio.wav"
-            clip.audio.write_audiofile(audio_path, verbose=False, logger=None)
-            
-            # Simulate transcription for summarization
-            sample_text = "This video demonstrates advanced video editing capabilities including AI-powered subtitle generation, video enhancement filters, and automated processing tools."
+            # Reuse the transcript from subtitle generation when it already ran
+            language = video.processing_options.get('subtitle_language', 'en')
+            transcript = self._ensure_transcript(video, language)
+            transcript_text = " ".join(segment['text'] for segment in transcript['segments'])
             
             if self.summarizer:
-                summary = self.summarizer(sample_text, max_length=130, min_length=30)
-                summary_text = summary[0]['summary_text']
+                summary_text = self._summarize_text(transcript_text)
             else:
                 summary_text = "Video summary: Advanced AI video editing demonstration."
             
@@ -444,12 +791,50 @@ class VideoService:
             with open(summary_path, 'w', encoding='utf-8') as f:
                 f.write(summary_text)
             
-            video.outputs["summary"] = summary_path
-            
-            clip.close()
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
+            video.set_output("summary", summary_path)
                 
             print("✅ Video summarization completed")
         except Exception as e:
-            print(f"❌ Error summarizing video: {e}")
\ No newline at end of file
+            print(f"❌ Error summarizing video: {e}")
+
+    def _summarize_text(self, text):
+        """Summarize text of any length: summarize each model-sized window, then the joined partial summaries"""
+        windows = self._token_windows(text)
+        if len(windows) == 1:
+            return self._summarize_window(windows[0])
+        
+        partial_summaries = [self._summarize_window(window) for window in windows]
+        return self._summarize_text(" ".join(partial_summaries))
+
+    def _token_windows(self, text):
+        """Split text into pieces that fit the summarizer's input length"""
+        tokenizer = self.summarizer.tokenizer
+        # BART accepts 1024 positions; leave room for the special tokens the pipeline adds
+        window = min(tokenizer.model_max_length, 1024) - tokenizer.num_special_tokens_to_add()
+        token_ids = tokenizer(text, add_special_tokens=False)["input_ids"]
+        return [
+            tokenizer.decode(token_ids[i:i + window], skip_special_tokens=True)
+            for i in range(0, max(len(token_ids), 1), window)
+        ]
+
+    def _summarize_window(self, text):
+        """Summarize one model-sized piece of text, reusing the cached result for identical input"""
+        key = hashlib.sha1(" ".join(text.split()).encode('utf-8')).digest()
+        now = time.monotonic()
+        
+        with self._summary_cache_lock:
+            cached = self._summary_cache.get(key)
+            if cached and now - cached[1] < self.summary_cache_ttl:
+                self._summary_cache.move_to_end(key)
+                return cached[0]
+        
+        # truncation guards against a decoded window re-tokenizing slightly longer
+        summary_text = self.summarizer(text, max_length=130, min_length=30, truncation=True)[0]['summary_text']
+        
+        with self._summary_cache_lock:
+            self._summary_cache[key] = (summary_text, now)
+            self._summary_cache.move_to_end(key)
+            while len(self._summary_cache) > self.summary_cache_size:
+                self._summary_cache.popitem(last=False)
+        
+        return summary_text